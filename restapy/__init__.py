@@ -6,4 +6,5 @@ from .responses import (
     PaginatedResponse,
     ProjectedResponse,
     ResourceResponse,
+    rebuild_responses,
 )
@@ -0,0 +1,30 @@
+"""
+Python side Levenshtein distance, used to filter the search results when the
+database lacks a native `levenshtein` function (i.e. Postgres' fuzzystrmatch).
+"""
+
+
+def lev_leq(a: str | None, b: str, max_d: int) -> bool:
+    """
+    Checks if the Levenshtein distance between the two strings is at most `max_d`.
+    Two-rows dynamic programming, bailing out as soon as a row exceeds the threshold.
+    """
+    if a is None or abs(len(a) - len(b)) > max_d:
+        return False
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > max_d:
+            return False
+        previous = current
+    return previous[-1] <= max_d
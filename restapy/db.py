@@ -1,13 +1,27 @@
-from functools import wraps
-from typing import Any, Callable, Iterator, Sequence
+import warnings
+from functools import lru_cache, wraps
+from typing import Any, Collection, Iterable, Iterator, Sequence
 
 from pydantic import BaseModel
-from sqlalchemy import ColumnElement, ColumnOperators, and_, func
-from sqlalchemy.orm.query import Query
+from sqlalchemy import (
+    ColumnElement,
+    ColumnOperators,
+    Select,
+    and_,
+    bindparam,
+    delete,
+    event,
+    func,
+    select,
+    true,
+)
+from sqlalchemy.inspection import inspect
+from sqlalchemy.orm import ORMExecuteState, selectinload
+from sqlalchemy.orm.strategy_options import Load
 from sqlmodel import Session, create_engine
 
 from .exceptions import NotFoundException
-from .filters import Conditions, QueryModelBase
+from .filters import Conditions, QueryModelBase, like_value
 from .models import DbModel
 
 
@@ -19,6 +33,12 @@ class DbInterface:
     """
 
     create_engine = create_engine
+    # Counts the paginated searches total with a `count(*) OVER ()` column in the
+    # page query, disable for dialects not supporting window functions.
+    window_count: bool = True
+    # Dialects natively running the custom filters `_sql_cond`, on the others the
+    # filters having a `_py_cond` (i.e. Levenshtein) are applied on fetched rows.
+    py_cond_free_dialects: set[str] = {"postgresql"}
 
     def __init__(self, session: Session):
         self.session = session
@@ -26,7 +46,10 @@ class DbInterface:
     def upsert(
         self, model: type[DbModel], instance_id: int | str, data: dict | BaseModel
     ) -> DbModel:
-        """Public api to update a model by primary key, returns the updated instance."""
+        """
+        Public api to update a model by primary key, returns the updated instance.
+        Issues a SELECT per call, use `bulk_upsert` when processing many ids.
+        """
         try:
             instance = self.get(model, instance_id)
         except NotFoundException:
@@ -38,14 +61,22 @@ class DbInterface:
     def update(
         self, model: type[DbModel], instance_id: int | str, data: dict | BaseModel
     ) -> DbModel:
-        """Public api to update a model by primary key, returns the updated instance."""
+        """
+        Public api to update a model by primary key, returns the updated instance.
+        Issues a SELECT per call, use `bulk_upsert` when processing many ids.
+        """
         instance = self.get(model, instance_id)
         instance.update(data)
         self.session.add(instance)
         return instance
 
     def delete(self, model: type[DbModel], instance_id: int | str) -> None:
-        """Public api to delete an instance by id."""
+        """
+        Public api to delete an instance by id.
+        Issues a SELECT and a DELETE per call, use `bulk_delete` for many ids:
+        being a Core DELETE it skips the ORM relationship cascades and the
+        `before_delete`/`after_delete` events, honoured here by `session.delete()`.
+        """
         instance = self.session.get(model, instance_id)
         self.session.delete(instance)
 
@@ -56,6 +87,66 @@ class DbInterface:
             raise NotFoundException(model.__class__.__name__, instance_id)
         return instance
 
+    @staticmethod
+    def _pk_column(model: type[DbModel]) -> ColumnElement:
+        """The model's attribute mapped to its (first) primary key column."""
+        return getattr(model, model.pk_field)
+
+    def bulk_get(
+        self, model: type[DbModel], instance_ids: Iterable[int | str]
+    ) -> dict[int | str, DbModel]:
+        """
+        Public api to get many model instances by primary key in a single query.
+        Returns them by the given ids, missing ids are left out.
+        """
+        pk = self._pk_column(model)
+        ids = {self._pk_value(pk, i): i for i in instance_ids}
+        query = select(model).where(pk.in_(list(ids)))
+        return {
+            ids[getattr(i, pk.key)]: i for i in self.session.execute(query).scalars()
+        }
+
+    @staticmethod
+    def _pk_value(pk: ColumnElement, instance_id: Any) -> Any:
+        """
+        Coerces an id, i.e. a str path parameter, to the PK column's python type,
+        as the database does when comparing them. Left as is if not coercible.
+        """
+        try:
+            python_type = pk.type.python_type
+            if isinstance(instance_id, python_type):
+                return instance_id
+            return python_type(instance_id)
+        except (NotImplementedError, TypeError, ValueError):
+            return instance_id
+
+    def bulk_upsert(
+        self, model: type[DbModel], items: dict[int | str, dict | BaseModel]
+    ) -> list[DbModel]:
+        """
+        Public api to upsert many models given their data by primary key,
+        fetching the existing ones in a single query. Returns the instances.
+        """
+        instances = self.bulk_get(model, items.keys())
+        out = []
+        for instance_id, data in items.items():
+            instance = instances.get(instance_id) or model()
+            instance.update(data)
+            out.append(instance)
+        self.session.add_all(out)
+        return out
+
+    def bulk_delete(
+        self, model: type[DbModel], instance_ids: Iterable[int | str]
+    ) -> None:
+        """
+        Public api to delete many instances by id, in a single Core DELETE.
+        Skips the ORM relationship cascades and the `before_delete`/`after_delete`
+        events, use `delete` for the instances relying on them.
+        """
+        pk = self._pk_column(model)
+        self.session.execute(delete(model).where(pk.in_(list(instance_ids))))
+
     def search(
         self, filters: QueryModelBase, *args, **kwargs
     ) -> tuple[Sequence[DbModel], int]:
@@ -70,114 +161,336 @@ class DbInterface:
             return search_mth(filters, *args, **kwargs)
         return self._search(filters)
 
-    def query_from_filters(self, filters: QueryModelBase, session: Session) -> Query:
+    def query_from_filters(
+        self, filters: QueryModelBase, session: Session | None = None
+    ) -> Select:
+        """
+        Public api to build the select statement of a QueryModel, with the filters
+        values bound. `session` is unused: the statement is executed by the caller.
+        """
+        query, _, params = self._statements(filters)
+        return query.params(**params)
+
+    def _statements(
+        self,
+        filters: QueryModelBase,
+        exclude: Collection[str] = (),
+        window: bool = False,
+    ) -> tuple[Select, Select | None, dict]:
+        """
+        Builds the select statement and, if paginated, its count twin from the filters,
+        skipping the `exclude` ones. With `window` paginated statements also select
+        the total in a `count(*) OVER ()` column.
+        Returns them along with the bind parameters values to execute them with.
+        """
         if not filters.model:
             raise AttributeError(f"No model defined for {filters}")
 
-        # Extraxt select fields or model
-        if filters.project:
-            what = [getattr(filters.model, f) for f in filters.project]
+        # Split the filters into bound values and custom conditions
+        ops = filters._compiled_ops
+        params, nulls, custom_conds = {}, [], []
+        for k, v in filters.model_filters:
+            if k in exclude:
+                continue
+            if k not in ops:
+                custom_conds.append(self._sql_cond(k, v, filters))
+            elif v is None:
+                # Comparisons with NULL are rendered as IS (NOT) NULL, no bind
+                nulls.append(k)
+            else:
+                _, _, transform = ops[k]
+                params[k] = transform(v) if transform else v
+
+        cache_key = (
+            filters.__class__,
+            tuple(sorted(params.keys())),
+            tuple(sorted(nulls)),
+            tuple(filters.order_by or ()),
+            tuple(filters.project or ()),
+            bool(filters.per_page) and window,
+        )
+        query = self._build_stmt(cache_key)
+        count_query = None
+        if custom_conds:
+            # Custom conditions depend on values, can't be cached
+            query = query.where(*custom_conds)
+            if filters.per_page:
+                count_query = self.count_query(query)
+        elif filters.per_page:
+            count_query = self._build_count_stmt(cache_key)
+        return query, count_query, params
+
+    @classmethod
+    @lru_cache(256)
+    def _build_stmt(cls, cache_key: tuple) -> Select:
+        """
+        Builds the select statement for a filters structure, using bind parameters
+        in place of the values. Cached on the structure, not on the values.
+        """
+        filters_cls, binds, nulls, order_by, project, window = cache_key
+        model = filters_cls.model
+
+        # Extraxt select fields or model, relationships can't be selected as
+        # columns: the instances are fetched with them and projected in `_project`
+        relationship_loads = cls._relationship_loads(model, project)
+        if project and not relationship_loads:
+            what = [getattr(model, f) for f in project]
         else:
-            what = [filters.model]
+            what = [model]
+        if window:
+            # The total is fetched along the page rows, stripped in `_window_search`
+            what.append(func.count().over().label("__total"))
 
         # Build the query using filters
-        query = session.query(*what).filter(self._where_from_filters(filters))
-        if filters.order_by:
+        query = select(*what).where(cls._bound_where(filters_cls, binds, nulls))
+        if order_by:
             # Adds the provided order by
-            query = query.order_by(*self.order_attrs(filters))
+            query = query.order_by(*cls._order_attrs(filters_cls, order_by))
+        if relationship_loads:
+            query = query.options(*relationship_loads)
         return query
 
+    @classmethod
+    @lru_cache(256)
+    def _build_count_stmt(cls, cache_key: tuple) -> Select:
+        """Cached count(*) twin of the `_build_stmt` statement."""
+        return cls.count_query(cls._build_stmt((*cache_key[:-1], False)))
+
     @staticmethod
-    def count_query(query: Query, model: type[DbModel]) -> Query:
-        """Returns the count(*) SA query with the same joins/where of the original"""
-        return (
-            query.statement.select_from(model)
-            .with_only_columns(func.count())
-            .order_by(None)
-        )
+    def count_query(query: Select, model: type[DbModel] | None = None) -> Select:
+        """
+        Returns the count(*) SA query with the same joins/where of the original.
+        `model` is unused, the original query is counted as a subquery.
+        """
+        return select(func.count()).select_from(query.order_by(None).subquery())
 
     @staticmethod
     def paginate_query(
-        query: Query,
+        query: Select,
         filters: QueryModelBase,
-    ) -> Query:
+    ) -> Select:
         """Adds limit/offset to a query, using filter's vals"""
         return query.limit(filters.per_page).offset(filters.offset)
 
-    @staticmethod
-    def order_attrs(filters: QueryModelBase) -> Iterator[ColumnOperators]:
+    @classmethod
+    def order_attrs(cls, filters: QueryModelBase) -> Iterator[ColumnOperators]:
         """Yields the SA order by attributes"""
-        for f in filters.order_by:
-            verse = ["asc", "desc"][int(bool(".desc" in f))]
-            yield getattr(getattr(filters.model, f.replace(".desc", "")), verse)()
+        return cls._order_attrs(filters.__class__, filters.order_by or ())
 
     @classmethod
     def pagination_queries(
-        cls, filters: QueryModelBase, query: Query
-    ) -> tuple[Query, Query | None]:
+        cls, filters: QueryModelBase, query: Select
+    ) -> tuple[Select, Select | None]:
         """
         Enriches the given query with the pagination pars from the filters.
         Builds a twin count non-paginated query.
         """
         count_query = None
         if filters.per_page:
-            count_query = cls.count_query(query, filters.model)
-            query = query.limit(filters.per_page).offset(filters.offset)
+            count_query = cls.count_query(query)
+            query = cls.paginate_query(query, filters)
         return query, count_query
 
+    @staticmethod
+    def _order_attrs(
+        filters_cls: type[QueryModelBase], order_by: Sequence[str]
+    ) -> Iterator[ColumnOperators]:
+        """Yields the SA order by attributes of the filters class `order_by` names"""
+        compiled_order = filters_cls._compiled_order
+        for f in order_by:
+            if f in compiled_order:
+                yield compiled_order[f]
+                continue
+            desc = f.endswith(".desc")
+            name = f[:-5] if desc else f
+            yield getattr(getattr(filters_cls.model, name), "desc" if desc else "asc")()
+
+    @classmethod
+    def warn_lazy_loads(cls, target: Session | type[Session] | Any) -> None:
+        """
+        Development helper, warns on each relationship lazy load executed via the
+        target Session (instance, class or sessionmaker): a query per accessed
+        instance, the N+1 queries pattern.
+        """
+        if not event.contains(target, "do_orm_execute", cls._warn_lazy_load):
+            event.listen(target, "do_orm_execute", cls._warn_lazy_load)
+
+    @staticmethod
+    def _warn_lazy_load(orm_execute_state: ORMExecuteState) -> None:
+        """The `warn_lazy_loads` listener, lazy loads are SELECTs only."""
+        if (
+            orm_execute_state.is_select
+            and orm_execute_state.lazy_loaded_from is not None
+        ):
+            warnings.warn(f"Lazy load of {orm_execute_state.loader_strategy_path[-1]}")
+
     def _search(self, filters: QueryModelBase) -> tuple[Sequence[DbModel], int]:
         """
-        Builds the complete query from a filter, creates a count twin query.
-        Executes the query and returns the results, and the count.
+        Builds the complete query from a filter, paginated queries also count the
+        total rows in a window column, or in a count twin query if `window_count`
+        is disabled. Executes the query and returns the results, and the count.
         """
-        base_query = self.query_from_filters(filters, self.session)
+        py_conds = self._py_conds(filters)
+        if py_conds:
+            return self._py_filtered_search(filters, py_conds)
+
+        query, count_query, params = self._statements(filters, window=self.window_count)
+        if count_query is not None and self.window_count:
+            return self._window_search(filters, query, count_query, params)
 
-        query, count_query = self.pagination_queries(filters, base_query)
         count = None
         if count_query is not None:
-            count = self.session.execute(count_query).scalar()
+            count = self.session.execute(count_query, params).scalar()
+            query = self.paginate_query(query, filters)
 
-        data = query.all()
-        if filters.project:
-            data = [r._mapping for r in data]
+        result = self.session.execute(query, params)
+        if filters.project and not self._loads_instances(filters):
+            data = [dict(row) for row in result.mappings()]
+        else:
+            data = self._project(filters, result.scalars().all())
         return data, count or len(data)
 
+    def _loads_instances(self, filters: QueryModelBase) -> bool:
+        """If the filters query selects the model instances, see `_build_stmt`."""
+        return not filters.project or bool(
+            self._relationship_loads(filters.model, tuple(filters.project))
+        )
+
+    @staticmethod
+    @lru_cache(256)
+    def _relationship_loads(
+        model: type[DbModel], project: tuple[str, ...]
+    ) -> tuple[Load, ...]:
+        """
+        Eager load options for the relationships among the projected fields,
+        loading each one with a single IN query instead of a query per row.
+        """
+        relationships = inspect(model).relationships
+        return tuple(
+            selectinload(getattr(model, f)) for f in project if f in relationships
+        )
+
+    def _project(
+        self, filters: QueryModelBase, instances: Sequence[DbModel]
+    ) -> Sequence[DbModel] | list[dict]:
+        """Projects the fetched instances on the filters `project` fields, if any."""
+        if not filters.project:
+            return instances
+        return [{f: getattr(i, f) for f in filters.project} for i in instances]
+
+    def _window_search(
+        self, filters: QueryModelBase, query: Select, count_query: Select, params: dict
+    ) -> tuple[Sequence[DbModel], int]:
+        """
+        Executes a paginated query reading the total from its trailing
+        `count(*) OVER ()` column, then strips it from the results.
+        """
+        rows = self.session.execute(self.paginate_query(query, filters), params).all()
+        if rows:
+            count = rows[0][-1]
+        elif filters.offset:
+            # Page out of range, no rows to read the total from
+            count = self.session.execute(count_query, params).scalar()
+        else:
+            count = 0
+        if self._loads_instances(filters):
+            data = self._project(filters, [r[0] for r in rows])
+        else:
+            data = [dict(zip(r._fields[:-1], r[:-1])) for r in rows]
+        return data, count
+
+    def _py_conds(self, filters: QueryModelBase) -> dict[str, Any]:
+        """
+        The filters to apply on the fetched rows, the ones with a `_py_cond`
+        when the session dialect can't run their `_sql_cond`.
+        """
+        py_conds = {k: v for k, v in filters.model_filters if hasattr(v, "_py_cond")}
+        if not py_conds:
+            return {}
+        bind = self.session.get_bind(mapper=filters.model)
+        if bind.dialect.name in self.py_cond_free_dialects:
+            return {}
+        return py_conds
+
+    def _py_filtered_search(
+        self, filters: QueryModelBase, py_conds: dict[str, Any]
+    ) -> tuple[Sequence[DbModel], int]:
+        """
+        Fetches all the instances matching the sql filters, then applies the
+        `py_conds` ones and the pagination/projection on the results.
+        """
+        unpaged = filters.model_copy(update={"per_page": None, "project": None})
+        query, _, params = self._statements(unpaged, exclude=py_conds)
+        if filters.project:
+            query = query.options(
+                *self._relationship_loads(filters.model, tuple(filters.project))
+            )
+        data = [
+            i
+            for i in self.session.execute(query, params).scalars()
+            if all(v._py_cond(i) for v in py_conds.values())
+        ]
+        count = len(data)
+        if filters.per_page:
+            data = data[filters.offset : filters.offset + filters.per_page]
+        return self._project(filters, data), count
+
     @classmethod
     def _sql_cond(
         cls, filter_field: str, value: Any, filters: QueryModelBase
-    ) -> Callable:
+    ) -> ColumnElement[bool]:
         """
         Builds the SQLAlchemy's `<model>.<property> <comparator> <value>`
         (i.e: Users.age <= 12) instance to use in the where method starting
-        from a RestApi filter.
+        from a RestApi filter missing from the filters compiled ops.
         If the provided filter have a `_sql_cond` method is used instead.
         """
         # Check for method override
         if hasattr(value, "_sql_cond"):
             return value._sql_cond(filters.model)
         # Filter name parsing
-        model_attr, condition, multi = QueryModelBase.parse_filter(filter_field)
-        # Transform the condition into a method name to get from the model
-        if condition in {Conditions.like, Conditions.ilike}:
-            getter_attr = condition
-        elif multi:
-            getter_attr = {Conditions.eq: "in_", Conditions.ne: "not_in"}[condition]
-        else:
-            getter_attr = f"__{condition}__"
+        model_attr, condition, multi = filters.parse_filter(filter_field)
         # Normalize value for like operations
         if condition in Conditions.likes:
-            value = f"%{value}%"
+            value = like_value(value)
         # Get the comparator method from the model's attribute
         # and call it with the value.
-        return getattr(getattr(filters.model, model_attr), getter_attr)(value)
+        column = getattr(filters.model, model_attr)
+        return getattr(column, condition.comparator(multi))(value)
 
     @classmethod
     def _where_from_filters(cls, filters: QueryModelBase) -> ColumnElement[bool]:
-        """Builds an AND-separated SQLAlchemy object, to use in a where, from the given filters."""
-        return and_(
-            True,
-            *(cls._sql_cond(k, v, filters) for k, v in filters.model_filters),
-        )
+        """
+        Builds an AND-separated SQLAlchemy object, to use in a where, from the given
+        filters values, using their compiled ops when available.
+        """
+        ops = filters._compiled_ops
+        clauses = []
+        for k, v in filters.model_filters:
+            if k not in ops:
+                clauses.append(cls._sql_cond(k, v, filters))
+                continue
+            _, comparator, transform = ops[k]
+            clauses.append(
+                comparator(transform(v) if transform and v is not None else v)
+            )
+        return and_(*clauses) if clauses else true()
+
+    @classmethod
+    def _bound_where(
+        cls,
+        filters_cls: type[QueryModelBase],
+        binds: Sequence[str],
+        nulls: Sequence[str] = (),
+    ) -> ColumnElement[bool]:
+        """
+        Builds an AND-separated SQLAlchemy object, to use in a where, from the given
+        filters names, using their compiled ops with a bind parameter or NULL.
+        """
+        ops = filters_cls._compiled_ops
+        clauses = [ops[k][1](bindparam(k)) for k in binds]
+        clauses += [ops[k][1](None) for k in nulls]
+        return and_(*clauses) if clauses else true()
 
     @staticmethod
     def transaction(fun):
@@ -1,4 +1,5 @@
 from enum import StrEnum
+from functools import lru_cache
 from itertools import chain
 from typing import (
     Annotated,
@@ -15,8 +16,10 @@ from typing import (
 from fastapi import Query as HttpQueryPars
 from pydantic import BaseModel, EmailStr, Field, GetCoreSchemaHandler, create_model
 from pydantic_core import CoreSchema, core_schema
-from sqlalchemy import and_, func, or_
+from sqlalchemy import UnaryExpression, and_, func, or_
+from sqlalchemy.inspection import inspect
 
+from ._lev import lev_leq
 from .models import DbModel
 from .utils import classproperty
 
@@ -44,6 +47,19 @@ class Conditions(StrEnum):
     def comparisons(cls) -> set[Self]:
         return {cls.ge, cls.le, cls.gt, cls.lt}
 
+    def comparator(self, multi: bool = False) -> str:
+        """Name of the SA column method implementing the condition."""
+        if self in Conditions.likes:
+            return self
+        if multi:
+            return {Conditions.eq: "in_", Conditions.ne: "not_in"}[self]
+        return f"__{self}__"
+
+
+def like_value(value: str) -> str:
+    """Normalize value for like operations"""
+    return f"%{value}%"
+
 
 class QueryModelBase(BaseModel):
     model_config = {
@@ -54,12 +70,42 @@ class QueryModelBase(BaseModel):
     base_fields: ClassVar[set[str]] = {"page", "per_page", "order_by", "project"}
     model: ClassVar[type[DbModel]] = None
     search_mth: ClassVar[str] = None
+    # {filter name: (model column, comparator, value transformer)}, set by QueryPars
+    _compiled_ops: ClassVar[dict[str, tuple]] = {}
+    # {order by value: SA order by clause}, set by QueryPars
+    _compiled_order: ClassVar[dict[str, UnaryExpression]] = {}
+    # Class invariants, computed once in `__pydantic_init_subclass__`
+    _model_attr_set: ClassVar[frozenset[str]] = frozenset()
+    _has_custom_filters: ClassVar[bool] = False
+    _parsed_fields: ClassVar[dict[str, tuple[str, Conditions, bool]]] = {}
+    _model_filter_fields: ClassVar[frozenset[str]] = frozenset()
 
     page: int = 0
     per_page: int = Field(None, alias="perPage")
     order_by: list = Field(None, alias="orderBy")
     project: list = None
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        if not cls.model:
+            return
+        cls._parsed_fields = {k: cls.parse_filter(k) for k in cls.model_fields}
+        cls._model_attr_set = frozenset(cls.model.model_fields.keys())
+        sql_cond_fields = {
+            k for k, f in cls.model_fields.items() if hasattr(f.annotation, "_sql_cond")
+        }
+        known_fields = cls.base_fields | cls._model_attr_set
+        cls._has_custom_filters = any(
+            field_name not in known_fields and k not in sql_cond_fields
+            for k, (field_name, _, _) in cls._parsed_fields.items()
+        )
+        cls._model_filter_fields = sql_cond_fields | {
+            k
+            for k, (field_name, _, _) in cls._parsed_fields.items()
+            if k not in cls.base_fields and field_name in cls._model_attr_set
+        }
+
     @property
     def offset(self) -> int:
         return self.page * self.per_page
@@ -70,6 +116,9 @@ class QueryModelBase(BaseModel):
 
     @classmethod
     def parse_filter(cls, field: str) -> tuple[str, Conditions, bool]:
+        parsed = cls._parsed_fields.get(field)
+        if parsed is not None:
+            return parsed
         multi = field.endswith("__in")
         field_parts = field[: -4 if multi else None].split("__")
         field_name = field_parts[0]
@@ -79,29 +128,14 @@ class QueryModelBase(BaseModel):
 
     @property
     def model_filters(self) -> Iterator[tuple]:
-        model_attrs = set(self.model.model_fields.keys())
-        data = self.model_dump(exclude_unset=True)
-        for k, f in self.model_fields.items():
-            if k not in data:
-                continue
-            v = data[k]
-            try:
-                sql_cond_filter = hasattr(f.annotation, "_sql_cond")
-            except AttributeError:
-                sql_cond_filter = False
-            if k in model_attrs or sql_cond_filter:
-                yield k, v
+        filter_fields = self._model_filter_fields
+        for k in self.__pydantic_fields_set__:
+            if k in filter_fields:
+                yield k, getattr(self, k)
 
     @property
     def has_custom_filters(self) -> bool:
-        model_attrs = set(self.model.model_fields.keys())
-        for k, f in self.model_fields.items():
-            k, _, _ = self.parse_filter(k)
-            if k not in self.base_fields | model_attrs and not hasattr(
-                f.annotation, "_sql_cond"
-            ):
-                return True
-        return False
+        return self._has_custom_filters
 
 
 class QueryPars:
@@ -115,21 +149,30 @@ class QueryPars:
         model = fields[0]._annotations["parententity"].entity
         class_attrs = {
             "order_by": (cls._order_by_annotation(model), Field(None, alias="orderBy")),
-            "project": (list[Literal[tuple(model.model_fields.keys())]], None),
+            "project": (list[Literal[cls._project_fields(model)]], None),
         }
+        camel_map = {f.name: cls.camel(f.name) for f in fields}
+        compiled_ops = {}
         for f in fields:
-            class_attrs.update(cls._field_filter_attrs(f, model))
+            field_attrs, field_ops = cls._field_filter_attrs(
+                f, model, camel_map[f.name]
+            )
+            class_attrs.update(field_attrs)
+            compiled_ops.update(field_ops)
 
         for f, f_typ in kwfields.items():
             class_attrs[f] = (f_typ, None)
 
-        return create_model(
+        filters_model = create_model(
             f"{model.__class__.__name__}FiltersBase",
             **class_attrs,
             model=model,
             search_mth=search_method,
             __base__=QueryModelBase,
         )
+        filters_model._compiled_ops = compiled_ops
+        filters_model._compiled_order = cls._compile_order(model)
+        return filters_model
 
     @staticmethod
     def _cond_valid_for(cond: Conditions, types: set[type]) -> bool:
@@ -140,28 +183,39 @@ class QueryPars:
         return cond not in Conditions.likes
 
     @staticmethod
+    @lru_cache(1024)
     def camel(snake_str: str) -> str:
         first, *others = snake_str.split("_")
         return "".join([first.lower(), *map(str.title, others)])
 
-    @classmethod
-    def field_names(cls, field_name: str, cond: Conditions) -> tuple[str, str, str]:
-        camelname = cls.camel(field_name)
+    @staticmethod
+    def field_names(
+        field_name: str, camelname: str, cond: Conditions
+    ) -> tuple[str, str, str]:
         if cond == Conditions.eq:
             return field_name, camelname, f"{field_name}__in"
         fname = f"{field_name}__{cond}"
         return fname, f"{camelname}[{cond}]", f"{fname}__in"
 
+    @staticmethod
+    def _compile_op(column, cond: Conditions, multi: bool = False) -> tuple:
+        """Resolves once the column comparator and value normalization of a filter."""
+        transform = like_value if cond in Conditions.likes else None
+        return column, getattr(column, cond.comparator(multi)), transform
+
     @classmethod
-    def _field_filter_attrs(cls, field, model) -> dict:
+    def _field_filter_attrs(cls, field, model, camelname: str) -> tuple[dict, dict]:
         pydantic_field = model.model_fields[field.name]
-        out = {}
+        column = getattr(model, field.name)
+        out, ops = {}, {}
         model_types = cls._normalize_field_types(field)
         for cond in Conditions:
             if not cls._cond_valid_for(cond, model_types):
                 continue
 
-            attr_name, alias, attr_name_multi = cls.field_names(field.name, cond)
+            attr_name, alias, attr_name_multi = cls.field_names(
+                field.name, camelname, cond
+            )
 
             if bool in model_types:
                 annotation = bool
@@ -177,6 +231,7 @@ class QueryPars:
             pyd_field = Field(None, alias=alias, description=pydantic_field.description)
 
             out[attr_name] = (annotation, pyd_field)
+            ops[attr_name] = cls._compile_op(column, cond)
 
             if cond in Conditions.exacts and bool not in model_types:
                 pyd_multi_field = Field(
@@ -186,7 +241,8 @@ class QueryPars:
                     Union[tuple(list[t] for t in model_types)],
                     pyd_multi_field,
                 )
-        return out
+                ops[attr_name_multi] = cls._compile_op(column, cond, multi=True)
+        return out, ops
 
     @staticmethod
     def _order_by_annotation(model: DbModel) -> Type[Annotated]:
@@ -194,6 +250,20 @@ class QueryPars:
         order_by_fields = chain(fields, (f"{k}.desc" for k in fields))
         return list[Literal[tuple(sorted(order_by_fields))]]
 
+    @staticmethod
+    def _project_fields(model: DbModel) -> tuple[str, ...]:
+        """The model fields and relationships a search can be projected on"""
+        return (*model.model_fields.keys(), *inspect(model).relationships.keys())
+
+    @staticmethod
+    def _compile_order(model: DbModel) -> dict[str, UnaryExpression]:
+        out = {}
+        for k in model.model_fields.keys():
+            column = getattr(model, k)
+            out[k] = column.asc()
+            out[f"{k}.desc"] = column.desc()
+        return out
+
     @staticmethod
     def _normalize_field_types(field) -> set:
         model = field._annotations["parententity"].entity
@@ -214,7 +284,11 @@ class QueryPars:
             return core_schema.no_info_after_validator_function(cls, handler(str))
 
         def sql_cond(self, model: DbModel):
-            return and_(func.levenshtein(getattr(model, field.name), self))
+            distance = func.levenshtein(getattr(model, field.name), self)
+            return distance <= self.max_distance
+
+        def py_cond(self, instance: DbModel) -> bool:
+            return lev_leq(getattr(instance, field.name), self, self.max_distance)
 
         return type(
             "Levenshtein",
@@ -223,6 +297,7 @@ class QueryPars:
                 "field": field,
                 "max_distance": max_distance,
                 "_sql_cond": sql_cond,
+                "_py_cond": py_cond,
                 "__get_pydantic_core_schema__": pydantic_levenshtein_schema,
             },
         )
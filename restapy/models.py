@@ -1,4 +1,5 @@
-from typing import Annotated, Type, TypeVar
+from functools import cache
+from typing import Annotated, Any, ClassVar, Type, TypeVar
 
 from pydantic import AfterValidator, BaseModel
 from sqlalchemy.inspection import inspect
@@ -9,13 +10,37 @@ from .utils import classproperty
 DataType = TypeVar("DataType")
 
 
+@cache
+def _primary_key(model: type[SQLModel]) -> tuple:
+    """Inspects the model's PK columns, once per model class."""
+    return inspect(model).primary_key
+
+
 class DbModel(SQLModel):
     """Wrapper on the base SQLModel class"""
 
+    # Non-PK fields, the ones `update` can set. Unset sqlmodel Field() pars are
+    # PydanticUndefined, hence the identity check.
+    _writable_fields: ClassVar[frozenset[str]] = frozenset()
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls._writable_fields = frozenset(
+            k
+            for k, f in cls.model_fields.items()
+            if getattr(f, "primary_key", False) is not True
+        )
+
     @classproperty
     def primary_key(cls) -> str:
         """Expose the model's PK"""
-        return inspect(cls).primary_key
+        return _primary_key(cls)
+
+    @classproperty
+    def pk_field(cls) -> str:
+        """The model's (first) PK field name"""
+        return _primary_key(cls)[0].name
 
     @classproperty
     def fapi_body(cls) -> Type[Annotated]:
@@ -26,9 +51,9 @@ class DbModel(SQLModel):
         """Bulk update the instance data."""
         if isinstance(data, BaseModel):
             data = data.model_dump(exclude_unset=True)
-        for k, v in (data or {}).items():
-            if k not in self.model_fields or hasattr(
-                self.model_fields[k], "primary_key"
-            ):
-                continue
-            setattr(self, k, v)
+        if not data:
+            return
+        writable = self._writable_fields
+        for k, v in data.items():
+            if k in writable:
+                setattr(self, k, v)
@@ -1,18 +1,28 @@
 import mimetypes
 from io import BytesIO
-from typing import Generic
+from typing import Any, ClassVar, Generic, Iterator, TypeVar
 
-from fastapi import Response
-from pydantic import BaseModel, Field, RootModel, computed_field
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    RootModel,
+    TypeAdapter,
+)
 
 from .filters import QueryModelBase
 from .models import DataType, DbModel
 
 
 class BaseDataResponse(BaseModel):
-    """Base class for all responses to handle common behaviour"""
+    """
+    Base class for all responses to handle common behaviour.
+    Responses are read-only, and their schema is built on first use: see
+    `rebuild_responses` to build the concrete ones at startup instead.
+    """
 
-    model_config = {"from_attributes": True}
+    model_config = ConfigDict(frozen=True, defer_build=True, from_attributes=True)
 
 
 class PaginationMeta(BaseDataResponse):
@@ -22,12 +32,8 @@ class PaginationMeta(BaseDataResponse):
     per_page: int | None
     total: int
     page_total: int
-
-    @computed_field
-    def pages(self) -> int | None:
-        if not self.per_page:
-            return
-        return (self.total + self.per_page - 1) // self.per_page
+    # Computed in `PaginatedResponse.build`
+    pages: int | None = None
 
 
 class ProjectedResponse(RootModel[dict]):
@@ -47,45 +53,128 @@ class ResourceResponse(BaseDataResponse, Generic[DataType]):
 class PaginatedResponse(BaseDataResponse, Generic[DataType]):
     """Multi-resource paginate response"""
 
-    data: list[DataType | ProjectedResponse] = Field(default_factory=list)
+    # Projected rows are plain mappings, kept as dicts if they don't fit DataType:
+    # projected endpoints should declare `PaginatedResponse[dict]`
+    data: list[DataType] | list[dict] = Field(
+        default_factory=list, union_mode="left_to_right"
+    )
     meta: PaginationMeta
 
+    # Data type of the concrete parametrizations, and its list serializer
+    _list_type: ClassVar[Any] = None
+    _list_adapter: ClassVar[TypeAdapter | None] = None
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        args = cls.__pydantic_generic_metadata__["args"]
+        if args and not isinstance(args[0], TypeVar):
+            cls._list_type = args[0]
+
+    @classmethod
+    def _get_list_adapter(cls) -> TypeAdapter | None:
+        """The data list serializer, built on first use like the response schema."""
+        if cls._list_type is None:
+            return None
+        if cls.__dict__.get("_list_adapter") is None:
+            cls._list_adapter = TypeAdapter(list[cls._list_type])
+        return cls._list_adapter
+
     @classmethod
     def build(
         cls, data: list[type[DbModel]], filters: QueryModelBase, total: int
     ) -> dict:
+        """
+        Builds the response payload. On concrete parametrizations, i.e.
+        `PaginatedResponse[User].build(...)`, non-projected data is serialized
+        at once to JSON types by the list adapter: return the payload from an
+        endpoint with `response_model=None` to skip fastapi's per-item validation.
+        """
+        list_adapter = cls._get_list_adapter()
+        if list_adapter is not None and not filters.project:
+            data = list_adapter.dump_python(data, mode="json")
+        per_page = filters.per_page
         return {
             "data": data,
             "meta": {
                 "page": filters.page,
-                "per_page": filters.per_page,
+                "per_page": per_page,
                 "total": total,
                 "page_total": len(data),
+                "pages": (total + per_page - 1) // per_page if per_page else None,
             },
         }
 
-
-mimetypes.add_type("application/vnd.ms-excel", "xlsx")
+    @classmethod
+    def orjson_response(
+        cls, data: list[type[DbModel]], filters: QueryModelBase, total: int
+    ) -> ORJSONResponse:
+        """
+        Builds the response already serialized with orjson, skipping fastapi's
+        jsonable_encoder. Requires the orjson package; to use it on all the
+        endpoints set `FastAPI(default_response_class=ORJSONResponse)` instead.
+        """
+        payload = cls.build(data, filters, total)
+        if cls._list_type is not None and not filters.project:
+            # Already serialized to JSON types by the list adapter
+            return ORJSONResponse(content=payload)
+        response = cls.model_validate(payload)
+        return ORJSONResponse(content=response.model_dump(mode="json"))
+
+
+# Pydantic caches the parametrizations by weak reference: the rebuilt ones are
+# kept here, or they would be collected and parametrized again unbuilt
+_rebuilt_responses: dict[type[DbModel], tuple[type[BaseDataResponse], ...]] = {}
+
+
+def rebuild_responses(*models: type[DbModel]) -> None:
+    """
+    Builds the schemas of the single and paginated responses of the given models,
+    and the paginated data serializers, to call in the app startup so that the first
+    requests don't pay for it. The built responses are kept for the app lifetime.
+    """
+    for model in models:
+        resource, paginated = ResourceResponse[model], PaginatedResponse[model]
+        resource.model_rebuild()
+        paginated.model_rebuild()
+        paginated._get_list_adapter()
+        _rebuilt_responses[model] = resource, paginated
+
+
+# Not in the mimetypes defaults, only in the system `mime.types` when available
+mimetypes.add_type(
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"
+)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_file(file: BytesIO) -> Iterator[bytes]:
+    """Yields the stream content by chunks, closing it when exhausted."""
+    file.seek(0)
+    try:
+        while chunk := file.read(DOWNLOAD_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
 
 
-class DownloadResponse(Response):
+class DownloadResponse(StreamingResponse):
     def __init__(self, file: BytesIO, filename: str, *args, **kwargs):
         """
-        Wrapper on the Response object that given a bytestream and a filename
-        enriches the response with a mimetype, the filename header, and the bytes
-        data closing the stream.
+        Wrapper on the StreamingResponse object that given a bytestream and a filename
+        enriches the response with a mimetype, the filename and length headers, and
+        streams the bytes data by chunks closing the stream.
         """
         custom_h = kwargs.pop("headers", None) or {}
-        try:
-            media_type = mimetypes.types_map[f".{filename.split('.')[-1]}"]
-        except KeyError:
-            media_type = "application/octet-stream"
-        file.seek(0)
+        media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
         super().__init__(
-            file.getvalue(),
+            _iter_file(file),
             *args,
-            headers={"Content-Disposition": f'inline; filename="{filename}"'}
+            headers={
+                "Content-Disposition": f'inline; filename="{filename}"',
+                "Content-Length": str(file.getbuffer().nbytes),
+            }
             | custom_h,
             media_type=media_type,
         )
-        file.close()
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Field, Relationship, Session, SQLModel
+
+from restapy import DbInterface, DbModel, QueryPars
+
+
+class Team(DbModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    name: str
+    heroes: list["Hero"] = Relationship(back_populates="team")
+
+
+class Hero(DbModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    name: str
+    age: int | None = None
+    team_id: int | None = Field(default=None, foreign_key="team.id")
+    team: Team | None = Relationship(back_populates="heroes")
+
+
+HeroFilters = QueryPars.build(
+    Hero.name,
+    Hero.age,
+    q=QueryPars.multi_like(Hero.name),
+    lev=QueryPars.levenshtein(Hero.name, 1),
+)
+
+HERO_NAMES = ["mario", "maria", "marco", "luigi", "marion", "dario"]
+
+
+@pytest.fixture
+def engine():
+    engine = DbInterface.create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        team = Team(name="team")
+        session.add(team)
+        for age, name in enumerate(HERO_NAMES):
+            # The last hero has no age
+            session.add(
+                Hero(name=name, age=age if name != "dario" else None, team=team)
+            )
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def db(session):
+    return DbInterface(session)
@@ -0,0 +1,170 @@
+import warnings
+
+import pytest
+from sqlalchemy import Select
+from sqlmodel import Session, select
+
+from restapy import DbInterface
+
+from .conftest import Hero, HeroFilters, Team
+
+
+def names(data):
+    return [d.name if isinstance(d, Hero) else d["name"] for d in data]
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({}, ["mario", "maria", "marco", "luigi", "marion", "dario"]),
+        ({"age__gt": 2}, ["luigi", "marion"]),
+        ({"age__le": 1}, ["mario", "maria"]),
+        ({"age__in": [1, 3]}, ["maria", "luigi"]),
+        ({"name__like": "ari"}, ["mario", "maria", "marion", "dario"]),
+        ({"name__ilike": "ARI"}, ["mario", "maria", "marion", "dario"]),
+        ({"q": "rio"}, ["mario", "marion", "dario"]),
+        ({"age": None}, ["dario"]),
+        ({"age__ne": None, "name": "luigi"}, ["luigi"]),
+    ],
+)
+def test_search_filters(db, filters, expected):
+    data, count = db.search(HeroFilters(**filters))
+    assert sorted(names(data)) == sorted(expected)
+    assert count == len(expected)
+
+
+def test_search_order_by(db):
+    data, _ = db.search(HeroFilters(age__ne=None, orderBy=["age.desc"]))
+    assert names(data) == ["marion", "luigi", "marco", "maria", "mario"]
+    data, _ = db.search(HeroFilters(orderBy=["name"]))
+    assert names(data) == sorted(names(data))
+
+
+def test_search_project(db):
+    data, count = db.search(HeroFilters(age__lt=2, project=["name", "age"]))
+    assert data == [{"name": "mario", "age": 0}, {"name": "maria", "age": 1}]
+    assert count == 2
+
+
+def test_search_project_relationship(db):
+    data, _ = db.search(HeroFilters(name="mario", project=["name", "team"]))
+    assert data[0]["name"] == "mario"
+    assert data[0]["team"].name == "team"
+
+
+@pytest.mark.parametrize("window_count", [True, False])
+def test_search_paginated(db, window_count):
+    db.window_count = window_count
+    filters = dict(perPage=4, orderBy=["name"])
+    data, count = db.search(HeroFilters(page=0, **filters))
+    assert names(data) == ["dario", "luigi", "marco", "maria"]
+    assert count == 6
+    data, count = db.search(HeroFilters(page=1, **filters))
+    assert names(data) == ["mario", "marion"]
+    assert count == 6
+    # Out of range page
+    data, count = db.search(HeroFilters(page=10, **filters))
+    assert data == []
+    assert count == 6
+    data, count = db.search(HeroFilters(page=0, name="nobody", **filters))
+    assert (data, count) == ([], 0)
+
+
+@pytest.mark.parametrize("window_count", [True, False])
+def test_search_paginated_project(db, window_count):
+    db.window_count = window_count
+    filters = HeroFilters(perPage=2, page=0, orderBy=["name"], project=["name"])
+    data, count = db.search(filters)
+    assert data == [{"name": "dario"}, {"name": "luigi"}]
+    assert count == 6
+
+
+def test_window_count_instance_override(session):
+    filters = HeroFilters(perPage=2, page=0, orderBy=["name"], project=["name"])
+    windowed = DbInterface(session)
+    unwindowed = DbInterface(session)
+    unwindowed.window_count = False
+    for db in (windowed, unwindowed, windowed):
+        data, count = db.search(filters)
+        assert data == [{"name": "dario"}, {"name": "luigi"}]
+        assert count == 6
+
+
+def test_query_from_filters(db, session):
+    filters = HeroFilters(age__in=[1, 2, 3], orderBy=["age.desc"], q="ma")
+    query = db.query_from_filters(filters, session)
+    assert isinstance(query, Select)
+    assert names(session.execute(query).scalars()) == ["marco", "maria"]
+    query, count_query = db.pagination_queries(HeroFilters(perPage=1), query)
+    assert names(session.execute(query).scalars()) == ["marco"]
+    assert session.execute(count_query).scalar() == 2
+
+
+def test_levenshtein_py_cond(db):
+    data, count = db.search(HeroFilters(lev="mario"))
+    assert sorted(names(data)) == ["dario", "marco", "maria", "mario", "marion"]
+    assert count == 5
+    data, count = db.search(HeroFilters(lev="mario", age__ne=None))
+    assert count == 4
+    data, count = db.search(
+        HeroFilters(lev="mario", perPage=2, page=1, orderBy=["name"], project=["name"])
+    )
+    assert data == [{"name": "maria"}, {"name": "mario"}]
+    assert count == 5
+
+
+def test_levenshtein_py_cond_model_binds(engine):
+    with Session(binds={Hero: engine}) as session:
+        data, count = DbInterface(session).search(HeroFilters(lev="luigi"))
+    assert names(data) == ["luigi"]
+    assert count == 1
+
+
+@pytest.fixture
+def strict_lazy_loads(session):
+    DbInterface.warn_lazy_loads(session)
+    DbInterface.warn_lazy_loads(session)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        yield
+
+
+def test_bulk_methods(db, session, strict_lazy_loads):
+    assert sorted(db.bulk_get(Hero, [1, 2, 99])) == [1, 2]
+    db.bulk_upsert(Hero, {1: {"name": "super mario"}, None: {"name": "peach"}})
+    session.flush()
+    assert db.get(Hero, 1).name == "super mario"
+    db.update(Hero, 2, {"age": 20})
+    session.flush()
+    db.bulk_delete(Hero, [3, 4])
+    session.commit()
+    assert sorted(db.bulk_get(Hero, range(1, 8))) == [1, 2, 5, 6, 7]
+    assert db.get(Hero, 2).age == 20
+
+
+def test_warn_lazy_loads(db, session, strict_lazy_loads):
+    team = db.get(Team, 1)
+    with pytest.warns(UserWarning, match="Lazy load of Team.heroes") as record:
+        team.heroes
+    assert len(record) == 1
+
+
+def test_bulk_methods_str_ids(db, session):
+    assert list(db.bulk_get(Hero, ["1", "99"])) == ["1"]
+    db.bulk_upsert(Hero, {"1": {"name": "super mario"}})
+    session.commit()
+    assert db.get(Hero, 1).name == "super mario"
+    assert db.search(HeroFilters())[1] == 6
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({}, 6),
+        ({"age__in": [1, 3], "name__like": "ari"}, 1),
+        ({"age": None, "q": "rio"}, 1),
+    ],
+)
+def test_where_from_filters(db, session, filters, expected):
+    where = db._where_from_filters(HeroFilters(**filters))
+    assert len(session.execute(select(Hero).where(where)).all()) == expected
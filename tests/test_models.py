@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+
+from .conftest import Hero
+
+
+class HeroPatch(BaseModel):
+    id: int | None = None
+    name: str | None = None
+    age: int | None = None
+
+
+def test_primary_key():
+    assert Hero.pk_field == "id"
+    assert [c.name for c in Hero.primary_key] == ["id"]
+    assert Hero._writable_fields == {"name", "age", "team_id"}
+
+
+def test_update_dict():
+    hero = Hero(id=1, name="mario", age=30)
+    hero.update({"id": 2, "name": "luigi", "unknown": 1})
+    assert (hero.id, hero.name, hero.age) == (1, "luigi", 30)
+    hero.update({})
+    assert (hero.id, hero.name, hero.age) == (1, "luigi", 30)
+
+
+def test_update_model():
+    hero = Hero(id=1, name="mario", age=30)
+    # Only the set fields are updated, the primary key never
+    hero.update(HeroPatch(id=2, age=None))
+    assert (hero.id, hero.name, hero.age) == (1, "mario", None)
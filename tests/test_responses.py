@@ -0,0 +1,138 @@
+import gc
+import json
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from pydantic import ValidationError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from restapy import (
+    DbModel,
+    DownloadResponse,
+    PaginatedResponse,
+    ResourceResponse,
+    rebuild_responses,
+)
+from restapy.responses import DOWNLOAD_CHUNK_SIZE, PaginationMeta
+
+from .conftest import Hero, HeroFilters
+
+
+class Item(DbModel):
+    name: str
+    price: Decimal
+
+
+ITEMS = [Item(name="a", price=Decimal("1.50")), Item(name="b", price=Decimal("2"))]
+
+
+@pytest.mark.parametrize("response", [PaginatedResponse, PaginatedResponse[Item]])
+def test_orjson_response(response):
+    filters = HeroFilters(perPage=2, page=0)
+    body = json.loads(response.orjson_response(ITEMS, filters, 3).body)
+    assert body["data"] == [
+        {"name": "a", "price": "1.50"},
+        {"name": "b", "price": "2"},
+    ]
+    assert body["meta"]["total"] == 3
+
+
+def test_orjson_response_project(db):
+    filters = HeroFilters(name="mario", project=["name"])
+    data, count = db.search(filters)
+    body = json.loads(
+        PaginatedResponse[dict].orjson_response(data, filters, count).body
+    )
+    assert body["data"] == [{"name": "mario"}]
+
+
+@pytest.mark.parametrize(
+    "filename, media_type",
+    [
+        ("a.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+        ("a.csv", "text/csv; charset=utf-8"),
+        ("a", "application/octet-stream"),
+    ],
+)
+def test_download_response(filename, media_type):
+    content = b"x" * (DOWNLOAD_CHUNK_SIZE * 2 + 1)
+    file = BytesIO(content)
+    app = FastAPI()
+
+    @app.get("/download")
+    def download():
+        return DownloadResponse(file, filename, headers={"X-Custom": "1"})
+
+    response = TestClient(app).get("/download")
+    assert response.content == content
+    assert response.headers["content-type"] == media_type
+    assert response.headers["content-length"] == str(len(content))
+    assert response.headers["content-disposition"] == f'inline; filename="{filename}"'
+    assert response.headers["x-custom"] == "1"
+    assert file.closed
+
+
+def test_responses_frozen():
+    meta = PaginationMeta(page=0, per_page=2, total=3, page_total=2)
+    with pytest.raises(ValidationError):
+        meta.total = 4
+
+
+def test_rebuild_responses():
+    class Rebuilt(DbModel):
+        name: str
+
+    # Schemas are built on first use
+    assert not PaginatedResponse[Rebuilt].__pydantic_complete__
+    assert "_list_adapter" not in PaginatedResponse[Rebuilt].__dict__
+    rebuild_responses(Rebuilt)
+    # Kept built, pydantic holds the parametrizations by weak reference only
+    gc.collect()
+    assert ResourceResponse[Rebuilt].__pydantic_complete__
+    assert PaginatedResponse[Rebuilt].__pydantic_complete__
+    assert "_list_adapter" in PaginatedResponse[Rebuilt].__dict__
+
+
+def test_build_list_adapter():
+    filters = HeroFilters()
+    payload = PaginatedResponse[Item].build(ITEMS, filters, 2)
+    assert payload["data"] == [
+        {"name": "a", "price": "1.50"},
+        {"name": "b", "price": "2"},
+    ]
+    # Unparametrized responses leave the serialization to the response model
+    assert PaginatedResponse.build(ITEMS, filters, 2)["data"] is ITEMS
+    rows = [{"name": "a"}]
+    projected = HeroFilters(project=["name"])
+    assert PaginatedResponse[Item].build(rows, projected, 1)["data"] is rows
+
+
+def test_paginated_data_union(db):
+    filters = HeroFilters(perPage=2, orderBy=["name"], project=["age"])
+    data, count = db.search(filters)
+    payload = PaginatedResponse.build(data, filters, count)
+    # Projected endpoints declare dict data, plain ones keep the rows as dicts
+    for response in (PaginatedResponse, PaginatedResponse[dict]):
+        assert response.model_validate(payload).model_dump()["data"] == [
+            {"age": None},
+            {"age": 3},
+        ]
+    filters = HeroFilters(perPage=1, orderBy=["name"])
+    data, count = db.search(filters)
+    response = PaginatedResponse[Hero].model_validate(
+        PaginatedResponse.build(data, filters, count)
+    )
+    assert isinstance(response.data[0], Hero)
+
+
+@pytest.mark.parametrize(
+    "per_page, total, pages",
+    [(2, 0, 0), (2, 3, 2), (2, 4, 2), (1, 1, 1), (None, 5, None)],
+)
+def test_pagination_pages(per_page, total, pages):
+    filters = HeroFilters(**({"perPage": per_page} if per_page else {}))
+    payload = PaginatedResponse.build([], filters, total)
+    assert payload["meta"]["pages"] == pages
+    assert PaginatedResponse.model_validate(payload).meta.pages == pages